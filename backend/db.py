@@ -6,9 +6,11 @@ from sqlalchemy import (
     Float,
     Text,
     DateTime,
+    Index,
     create_engine,
     text,
 )
+from sqlalchemy import event
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.sql import func
 
@@ -24,7 +26,7 @@ class Email(Base):
     subject = Column(String, default="")
     sender = Column(String, default="")
     snippet = Column(Text, default="")
-    body = Column(Text, default="")
+    body = Column(Text, default="")  # truncated at ingest (MAX_BODY_CHARS)
     internal_date = Column(Integer)  # epoch ms
     is_unread = Column(Boolean, default=True)
     is_important = Column(Boolean, default=False)
@@ -36,9 +38,32 @@ class Email(Base):
     assistant_summary = Column(Text, default="")
     assistant_reply = Column(Text, default="")
 
+    __table_args__ = (
+        # /emails filters on is_important and orders by internal_date DESC;
+        # this lets SQLite answer it with an index-range scan instead of a
+        # filtered scan plus sort.
+        Index("ix_emails_important_internal_date", is_important, internal_date.desc()),
+        Index("ix_emails_internal_date", internal_date),
+    )
+
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL + NORMAL cuts commit fsyncs for this single-writer app and lets
+    # /emails reads proceed while the poller is writing. journal_mode is
+    # persistent but the rest are per-connection, so apply them to every
+    # pooled connection.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
 def init_db():
     Base.metadata.create_all(engine)
     with engine.begin() as conn:
@@ -53,3 +78,14 @@ def init_db():
         ensure_column("assistant_message", "assistant_message TEXT DEFAULT ''")
         ensure_column("assistant_summary", "assistant_summary TEXT DEFAULT ''")
         ensure_column("assistant_reply", "assistant_reply TEXT DEFAULT ''")
+
+        # create_all only creates indexes for brand-new tables; bring
+        # pre-existing databases up to date explicitly.
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_emails_important_internal_date "
+            "ON emails (is_important, internal_date DESC)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_emails_internal_date "
+            "ON emails (internal_date)"
+        ))
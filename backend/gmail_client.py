@@ -1,8 +1,11 @@
+import binascii
+import heapq
 import os
-import base64
 import re
 import time
+from functools import lru_cache
 from html import unescape
+from itertools import islice
 from typing import Dict, Optional, Tuple
 
 from google.oauth2.credentials import Credentials
@@ -12,42 +15,103 @@ from googleapiclient.discovery import build
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 
 
+_B64_URLSAFE_TRANS = bytes.maketrans(b"-_", b"+/")
+
+try:
+    # SIMD base64 decoder; roughly 4-8x stdlib on bodies that spill L1.
+    import pybase64
+
+    def _b64decode(raw: bytes) -> bytes:
+        return pybase64.b64decode(raw, validate=False)
+except ImportError:  # pragma: no cover - optional speedup
+    def _b64decode(raw: bytes) -> bytes:
+        return binascii.a2b_base64(raw, strict_mode=False)
+
+
 def _decode_body_data(data: Optional[str]) -> str:
     if not data:
         return ""
-    padded = data + "=" * (-len(data) % 4)
     try:
-        return base64.urlsafe_b64decode(padded).decode("utf-8", errors="ignore")
+        # One translate + one decode pass; urlsafe_b64decode re-translates
+        # and validates internally, costing an extra copy on large bodies.
+        raw = data.encode("ascii").translate(_B64_URLSAFE_TRANS)
+        raw += b"=" * (-len(raw) % 4)
+        return _b64decode(raw).decode("utf-8", errors="ignore")
     except Exception:
         return ""
 
 
-def _html_to_text(html: str) -> str:
-    if not html:
-        return ""
+# Patterns are compiled once at import; the re module's internal cache is
+# small and keyed by pattern string, so per-call re.sub would re-parse them.
+_HTML_TOKEN_RE = re.compile(r"(?s)<!--.*?-->|<(/?)([a-zA-Z0-9]+)[^>]*>|<[^>]*>|([^<]+)")
+# Single C-level pass for the character-class rewrites the old regex chain
+# handled; CRLF pairs become "\n\n" here and collapse in the newline pass.
+_WS_TRANS = str.maketrans({"\t": " ", "\u00a0": " ", "\r": "\n"})
+_NL_COLLAPSE_RE = re.compile(r"\s*\n\s*")
+_MULTI_SPACE_RE = re.compile(r" {2,}")
+_MULTI_NL_RE = re.compile(r"\n{3,}")
 
-    # Remove scripts/styles first to avoid noise in the output.
-    cleaned = re.sub(r"(?is)<(script|style)[^>]*>.*?</\\1>", "", html)
+# Block-level tags that become a newline on open or close.
+_BLOCK_TAGS = frozenset({
+    "p", "div", "section", "article",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+    "tr", "table", "tbody", "thead", "tfoot",
+})
 
-    replacements = {
-        r"(?is)<br\s*/?>": "\n",
-        r"(?is)</(p|div|section|article|h[1-6]|tr)>": "\n",
-        r"(?is)<(p|div|section|article|h[1-6]|tr)[^>]*>": "\n",
-        r"(?is)<li[^>]*>": "\n- ",
-        r"(?is)</li>": "\n",
-        r"(?is)</?(table|tbody|thead|tfoot)>": "\n",
-    }
 
-    for pattern, replacement in replacements.items():
-        cleaned = re.sub(pattern, replacement, cleaned)
+def _html_to_text(html: str) -> str:
+    if not html:
+        return ""
 
-    cleaned = re.sub(r"(?is)<[^>]+>", "", cleaned)
-    cleaned = unescape(cleaned)
-    cleaned = cleaned.replace("\r\n", "\n").replace("\r", "\n")
-    cleaned = re.sub(r"[\t\u00a0]+", " ", cleaned)
-    cleaned = re.sub(r"\n\s+", "\n", cleaned)
-    cleaned = re.sub(r"\s+\n", "\n", cleaned)
-    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned)
+    # One linear scan over the document: text runs are unescaped and
+    # appended, block tags emit separators. Script/style blocks are
+    # skipped by jumping straight past their closing tag: a raw '<'
+    # inside them (e.g. `if (a<b)`) desyncs the token stream and the
+    # real closing tag would never be delivered, silently dropping the
+    # rest of the document. Replaces the old seven-pass re.sub pipeline.
+    out: list[str] = []
+    lowered = None  # lazily built; only needed to find closing tags
+    pos = 0
+    length = len(html)
+    while pos < length:
+        m = _HTML_TOKEN_RE.match(html, pos)
+        if m is None:
+            # Trailing '<' with no closing '>'; nothing parseable remains.
+            break
+        pos = m.end()
+        text = m.group(3)
+        if text is not None:
+            out.append(unescape(text))
+            continue
+        tag = m.group(2)
+        if tag is None:
+            # Comment or markup the tag pattern could not parse.
+            continue
+        tag = tag.lower()
+        closing = m.group(1) == "/"
+        if tag in ("script", "style"):
+            if closing:
+                # Stray close tag with no matching open; ignore it.
+                continue
+            if lowered is None:
+                lowered = html.lower()
+            end = lowered.find("</" + tag, pos)
+            if end < 0:
+                # Unterminated block swallows the rest of the document.
+                break
+            gt = lowered.find(">", end)
+            pos = gt + 1 if gt >= 0 else length
+            continue
+        if tag == "br":
+            out.append("\n")
+        elif tag == "li":
+            out.append("\n" if closing else "\n- ")
+        elif tag in _BLOCK_TAGS:
+            out.append("\n")
+
+    cleaned = "".join(out).translate(_WS_TRANS)
+    cleaned = _NL_COLLAPSE_RE.sub("\n", cleaned)
+    cleaned = _MULTI_SPACE_RE.sub(" ", cleaned)
     return cleaned.strip()
 
 
@@ -55,7 +119,7 @@ def _normalize_body(text: str) -> str:
     if not text:
         return ""
     text = text.replace("\r\n", "\n").replace("\r", "\n")
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _MULTI_NL_RE.sub("\n\n", text)
     return text.strip()
 
 
@@ -63,12 +127,28 @@ class AuthRequired(Exception):
     """Raised when Gmail access requires user interaction."""
 
 
-# state -> (flow, created_at)
+# state -> (flow, created_at), with a parallel min-heap of (expiry, state,
+# created_at) so cleanup only touches entries that actually expired.
 _pending_flows: Dict[str, Tuple[InstalledAppFlow, float]] = {}
+_flow_expiry_heap: list = []
 _FLOW_TTL_SECONDS = 15 * 60
 
 
+@lru_cache(maxsize=4)
+def _exists_cached(path: str, bucket: int) -> bool:
+    # Keyed on a coarse time bucket so each path is stat(2)'d at most once
+    # per second; flows that touch the token file clear the cache directly.
+    return os.path.exists(path)
+
+
+def _exists(path: str) -> bool:
+    return _exists_cached(path, int(time.monotonic()))
+
+
+@lru_cache(maxsize=1)
 def _get_paths():
+    # The paths are fixed for the process lifetime; tests that monkeypatch
+    # the env vars should call _get_paths.cache_clear().
     token_path = os.getenv("GOOGLE_TOKEN_PATH", "/app/token.json")
     creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH", "/app/credentials.json")
     return token_path, creds_path
@@ -77,11 +157,11 @@ def _get_paths():
 def ensure_auth():
     token_path, creds_path = _get_paths()
 
-    if not os.path.exists(creds_path):
+    if not _exists(creds_path):
         raise AuthRequired("Gmail credentials.json not found")
 
     creds = None
-    if os.path.exists(token_path):
+    if _exists(token_path):
         creds = Credentials.from_authorized_user_file(token_path, SCOPES)
 
     if not creds:
@@ -98,17 +178,21 @@ def ensure_auth():
 
 
 def _cleanup_flows(now: Optional[float] = None):
-    if not _pending_flows:
+    if not _flow_expiry_heap:
         return
     now = now or time.time()
-    expired = [state for state, (_, created) in _pending_flows.items() if now - created > _FLOW_TTL_SECONDS]
-    for state in expired:
-        _pending_flows.pop(state, None)
+    while _flow_expiry_heap and _flow_expiry_heap[0][0] <= now:
+        _, state, created = heapq.heappop(_flow_expiry_heap)
+        entry = _pending_flows.get(state)
+        # Only drop the entry if it is still the one this heap record was
+        # created for; a re-inserted state has a newer heap record too.
+        if entry is not None and entry[1] == created:
+            _pending_flows.pop(state, None)
 
 
 def start_auth_flow(callback_url: str) -> str:
     token_path, creds_path = _get_paths()
-    if not os.path.exists(creds_path):
+    if not _exists(creds_path):
         raise FileNotFoundError("Gmail credentials.json not found")
 
     flow = InstalledAppFlow.from_client_secrets_file(creds_path, SCOPES)
@@ -120,7 +204,9 @@ def start_auth_flow(callback_url: str) -> str:
     )
 
     _cleanup_flows()
-    _pending_flows[state] = (flow, time.time())
+    created = time.time()
+    _pending_flows[state] = (flow, created)
+    heapq.heappush(_flow_expiry_heap, (created + _FLOW_TTL_SECONDS, state, created))
 
     # Remove stale token to avoid confusion while a new flow is in progress.
     if os.path.exists(token_path):
@@ -128,7 +214,9 @@ def start_auth_flow(callback_url: str) -> str:
             os.remove(token_path)
         except OSError:
             pass
+    _exists_cached.cache_clear()
 
+    reset_gmail_service()
     return auth_url
 
 
@@ -145,18 +233,36 @@ def complete_auth_flow(state: str, code: str):
 
     with open(token_path, "w") as token:
         token.write(creds.to_json())
+    _exists_cached.cache_clear()
 
+    reset_gmail_service()
     return creds
 
 
+# Cached service so repeat polls reuse the discovery document and the warm
+# HTTPS connection instead of rebuilding the client every cycle.
+_gmail_service = None
+
+
 def get_gmail():
-    creds = ensure_auth()
-    service = build("gmail", "v1", credentials=creds, cache_discovery=False)
-    return service
+    global _gmail_service
+    if _gmail_service is None:
+        creds = ensure_auth()
+        _gmail_service = build("gmail", "v1", credentials=creds, cache_discovery=False)
+    return _gmail_service
+
+
+def reset_gmail_service():
+    """Drop the cached Gmail service, e.g. after an auth or API failure."""
+    global _gmail_service
+    _gmail_service = None
 
 
 DEFAULT_RECENT_QUERY = "newer_than:7d -category:promotions"
 
+# Stop decoding MIME parts once this much plain text has been collected.
+_MAX_BODY_SCAN_CHARS = 64 * 1024
+
 
 def list_recent_messages(
     service,
@@ -168,7 +274,14 @@ def list_recent_messages(
     res = (
         service.users()
         .messages()
-        .list(userId="me", q=query, maxResults=max_results)
+        .list(
+            userId="me",
+            q=query,
+            maxResults=max_results,
+            # We only consume message ids; the mask roughly halves the
+            # response payload and its JSON-parse cost.
+            fields="messages/id,nextPageToken",
+        )
         .execute()
     )
     return res.get("messages", [])
@@ -178,46 +291,128 @@ def get_message(service, msg_id: str) -> Dict:
     return service.users().messages().get(userId="me", id=msg_id, format="full").execute()
 
 
+# Gmail's batch endpoint accepts at most 100 sub-requests per POST.
+_BATCH_GET_LIMIT = 100
+
+
+def get_messages_batch(service, msg_ids: list[str]) -> Dict[str, Dict]:
+    """Fetch full messages by id, batching up to 100 gets per HTTP request.
+
+    Returns a dict keyed by message id; ids whose sub-request failed are
+    simply absent. Falls back to serial gets when the client does not
+    support batching.
+    """
+    results: Dict[str, Dict] = {}
+    if not msg_ids:
+        return results
+
+    def _collect(request_id, response, exception):
+        if exception is not None:
+            return
+        if response is not None:
+            results[request_id] = response
+
+    ids = iter(msg_ids)
+    while True:
+        chunk = list(islice(ids, _BATCH_GET_LIMIT))
+        if not chunk:
+            break
+        try:
+            batch = service.new_batch_http_request()
+            for mid in chunk:
+                batch.add(
+                    service.users().messages().get(userId="me", id=mid, format="full"),
+                    request_id=mid,
+                    callback=_collect,
+                )
+            batch.execute()
+        except Exception:
+            # Batch endpoint unavailable (older client, mocked service);
+            # one round trip per message is still correct, just slower.
+            for mid in chunk:
+                try:
+                    results[mid] = get_message(service, mid)
+                except Exception:
+                    continue
+    return results
+
+
 def extract_payload(message: Dict) -> Dict[str, Optional[str]]:
     payload = message.get("payload", {}) or {}
-    headers = {h["name"].lower(): h["value"] for h in payload.get("headers", [])}
-    subject = headers.get("subject", "")
-    sender = headers.get("from", "")
+
+    # Only two headers matter; scan for them instead of lowercasing and
+    # hashing the full 20-40 entry header list (Received chains included).
+    subject = sender = ""
+    need = 2
+    for h in payload.get("headers") or ():
+        name = h["name"]
+        if not subject and (name == "Subject" or name.lower() == "subject"):
+            subject = h["value"]
+            need -= 1
+        elif not sender and (name == "From" or name.lower() == "from"):
+            sender = h["value"]
+            need -= 1
+        if not need:
+            break
     snippet = message.get("snippet", "")
 
     plain_parts: list[str] = []
     html_parts: list[str] = []
+    plain_len = 0
 
-    def collect(part: Dict) -> None:
+    # Iterative depth-first walk; reversed() keeps part order identical to
+    # the old recursive traversal.
+    stack = [payload]
+    while stack:
+        part = stack.pop()
         mime = (part.get("mimeType") or "").lower()
 
         if mime.startswith("multipart/"):
-            for sub in part.get("parts", []) or []:
-                collect(sub)
-            return
-
-        body_data = part.get("body", {}).get("data")
-        text = _decode_body_data(body_data)
+            # `or ()` reuses the empty-tuple singleton instead of allocating
+            # a fresh list for every childless part.
+            parts = part.get("parts") or ()
+            if mime == "multipart/alternative":
+                # The alternatives carry the same content; when a plain part
+                # exists there is no reason to base64-decode its (usually
+                # much larger) HTML twin.
+                plains = [
+                    sub
+                    for sub in parts
+                    if (sub.get("mimeType") or "").lower() == "text/plain"
+                    and (sub.get("body") or {}).get("data")
+                ]
+                if plains:
+                    parts = plains
+            stack.extend(reversed(parts))
+            continue
+
+        body = part.get("body")
+        text = _decode_body_data(body.get("data") if body else None)
 
         if mime == "text/plain":
             if text:
                 plain_parts.append(text)
+                plain_len += len(text)
         elif mime == "text/html":
             if text:
                 html_parts.append(text)
         elif text and (mime.startswith("text/") or not mime):
             plain_parts.append(text)
+            plain_len += len(text)
 
-        for sub in part.get("parts", []) or []:
-            collect(sub)
+        # Downstream consumers cap the body anyway; stop decoding once we
+        # have plenty of plain text.
+        if plain_len >= _MAX_BODY_SCAN_CHARS:
+            break
 
-    collect(payload)
+        stack.extend(reversed(part.get("parts") or ()))
 
     if plain_parts:
         body_text = "\n".join(part.strip() for part in plain_parts if part.strip())
     else:
-        html_texts = [_html_to_text(part) for part in html_parts]
-        body_text = "\n\n".join(text for text in html_texts if text)
+        body_text = "\n\n".join(
+            text for text in (_html_to_text(part) for part in html_parts) if text
+        )
 
     body = _normalize_body(body_text)
 
@@ -0,0 +1,83 @@
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import app  # noqa: E402
+from gmail_client import AuthRequired  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _fresh_poll_state(monkeypatch):
+    """Each test runs its own event loop via asyncio.run, so give it a
+    condition bound to that loop instead of one left over from a neighbour."""
+    monkeypatch.setattr(app, "poll_cv", asyncio.Condition())
+    monkeypatch.setattr(app, "_poll_active", False)
+    monkeypatch.setattr(app, "_poll_pending", False)
+    monkeypatch.setattr(app, "_poll_generation", 0)
+
+
+def _install_blocking_gmail(monkeypatch):
+    """Stub get_gmail so the poll cycle blocks until released, then bails
+    out early via the auth_required path without touching the network."""
+    release = threading.Event()
+    calls = []
+
+    def fake_get_gmail():
+        calls.append(1)
+        release.wait(timeout=5)
+        raise AuthRequired("test")
+
+    monkeypatch.setattr(app, "get_gmail", fake_get_gmail)
+    return release, calls
+
+
+def test_racing_triggers_queue_exactly_one_follow_up_run(monkeypatch):
+    release, calls = _install_blocking_gmail(monkeypatch)
+
+    async def scenario():
+        first = asyncio.create_task(app.run_poll_cycle("scheduled"))
+        await asyncio.sleep(0.05)
+        racers = [
+            asyncio.create_task(app.run_poll_cycle(f"manual_{i}")) for i in range(3)
+        ]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(first, *racers), timeout=5)
+
+    results = asyncio.run(scenario())
+
+    statuses = sorted(result["status"] for result in results)
+    # One racer claims the follow-up run; the other two coalesce into it.
+    assert statuses == ["auth_required", "auth_required", "coalesced", "coalesced"]
+    assert len(calls) == 2
+
+
+def test_cancelled_follow_up_claim_releases_the_pending_slot(monkeypatch):
+    release, calls = _install_blocking_gmail(monkeypatch)
+
+    async def scenario():
+        first = asyncio.create_task(app.run_poll_cycle("scheduled"))
+        await asyncio.sleep(0.05)
+        claimant = asyncio.create_task(app.run_poll_cycle("manual_reset"))
+        await asyncio.sleep(0.05)
+        # The /reset client disconnects while its trigger waits its turn.
+        claimant.cancel()
+        try:
+            await claimant
+        except asyncio.CancelledError:
+            pass
+        release.set()
+        await asyncio.wait_for(first, timeout=5)
+        # Polling must still be alive: a later trigger gets a real run
+        # instead of coalescing against a follow-up that will never start.
+        return await asyncio.wait_for(app.run_poll_cycle("scheduled"), timeout=5)
+
+    result = asyncio.run(scenario())
+
+    assert result["status"] == "auth_required"
+    assert len(calls) == 2
@@ -4,7 +4,7 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from gmail_client import extract_payload  # noqa: E402
+from gmail_client import _html_to_text, extract_payload, get_messages_batch  # noqa: E402
 
 
 def _encode(value: str) -> str:
@@ -44,6 +44,53 @@ def test_extract_payload_converts_html_body_to_text():
     assert "- Confirm availability" in payload["body"]
 
 
+def test_html_to_text_survives_raw_angle_bracket_in_script():
+    html = (
+        "<script>if(a<b){x()}</script>"
+        "<p>Hello</p>"
+        "<style>a<b{color:red}</style>"
+        "<p>World</p>"
+    )
+
+    text = _html_to_text(html)
+
+    assert "Hello" in text
+    assert "World" in text
+    assert "x()" not in text
+    assert "color" not in text
+
+
+def test_get_messages_batch_falls_back_to_serial_gets():
+    class FakeGet:
+        def __init__(self, msg_id: str):
+            self._msg_id = msg_id
+
+        def execute(self):
+            return {"id": self._msg_id, "snippet": f"body of {self._msg_id}"}
+
+    class FakeMessages:
+        def get(self, userId, id, format):
+            return FakeGet(id)
+
+    class FakeUsers:
+        def messages(self):
+            return FakeMessages()
+
+    class FakeService:
+        """Mimics a client without batch support, like an older library."""
+
+        def new_batch_http_request(self):
+            raise AttributeError("batch endpoint unavailable")
+
+        def users(self):
+            return FakeUsers()
+
+    results = get_messages_batch(FakeService(), ["m1", "m2", "m3"])
+
+    assert sorted(results) == ["m1", "m2", "m3"]
+    assert results["m2"]["snippet"] == "body of m2"
+
+
 def test_extract_payload_prefers_plain_text_when_available():
     plain_text = "Plain line one\nLine two"
     html_text = "<p>Plain line one</p><p>Different html</p>"
@@ -128,6 +128,35 @@ def test_looks_like_marketing_flags_newsletter_issue_header():
     assert _has_reply_cue(email_text) is False
 
 
+def test_header_extraction_survives_length_changing_lowercase():
+    # 'İ' (U+0130) lowers to two characters, so indexes computed on a
+    # lowered copy would bleed past the header line on the original text.
+    email_text = "From: İstanbul İrem <irem@example.com>\nSubject: Plan\n\nHi."
+
+    view = triage._EmailView(email_text)
+
+    assert view.subject == "Plan"
+    assert "irem@example.com" in view.sender
+    assert "\n" not in view.sender
+    assert triage._extract_subject_line(email_text) == "Plan"
+
+
+def test_generation_configs_survive_sdk_schema_normalization():
+    # The SDK only normalizes response_schema inside generate_content, so a
+    # schema its pydantic layer rejects (e.g. typing.TypedDict on Python
+    # 3.11) would crash every real call despite the config building fine.
+    from google.generativeai.types import generation_types
+
+    for factory in (
+        triage._classify_config,
+        triage._assistant_config,
+        triage._combined_config,
+    ):
+        config = factory()
+        config_dict = generation_types.to_generation_config_dict(config)
+        assert config_dict.get("response_schema") is not None
+
+
 def test_classify_handles_empty_model_response(monkeypatch):
     class DummyResponse:
         text = ""
@@ -139,6 +168,26 @@ def test_classify_handles_empty_model_response(monkeypatch):
 
     monkeypatch.setattr(triage, "get_classifier_model", lambda: DummyModel())
 
+    email_text = (
+        "From: Bob <bob@example.com>\n"
+        "Subject: FYI\n\n"
+        "Sharing the meeting notes from today."
+    )
+
+    result = classify(email_text)
+
+    assert result["importance"] is False
+    assert result["reply_needed"] is False
+    assert result["rationale"] == "Model response was empty."
+
+
+def test_classify_skips_model_for_marketing_without_reply_cue(monkeypatch):
+    class ExplodingModel:
+        def generate_content(self, *args, **kwargs):  # pragma: no cover - guard
+            raise AssertionError("model should not be called for plain marketing")
+
+    monkeypatch.setattr(triage, "get_classifier_model", lambda: ExplodingModel())
+
     email_text = (
         "From: Promotions <promo@example.com>\n"
         "Subject: Weekly Deals\n\n"
@@ -149,7 +198,7 @@ def test_classify_handles_empty_model_response(monkeypatch):
 
     assert result["importance"] is False
     assert result["reply_needed"] is False
-    assert result["rationale"] == "Model response was empty."
+    assert result["rationale"] == "Rule-based marketing classification; LLM skipped."
 
 
 def test_classify_flags_priority_document_request_even_with_marketing(monkeypatch):
@@ -181,6 +230,75 @@ def test_classify_flags_priority_document_request_even_with_marketing(monkeypatc
     assert result["reply_needed_score"] >= 0.6
 
 
+def test_classify_and_draft_returns_guidance_for_actionable_email(monkeypatch):
+    class DummyResponse:
+        def __init__(self, text: str):
+            self.text = text
+            self.candidates: list[dict[str, str]] = []
+
+    class DummyModel:
+        def generate_content(self, *args, **kwargs):  # pragma: no cover - simple stub
+            payload = json.dumps(
+                {
+                    "importance": True,
+                    "importance_score": 0.9,
+                    "reply_needed": True,
+                    "reply_needed_score": 0.85,
+                    "rationale": "Direct request with a deadline.",
+                    "notification": "Erin needs the signed contract today.",
+                    "summary": [
+                        "Erin is waiting on the signed contract.",
+                        "Deadline is end of day.",
+                        "She offered to hop on a call.",
+                        "Extra bullet the UI never shows.",
+                    ],
+                    "reply_draft": "Hi Erin,\n\nSending the signed copy shortly.",
+                }
+            )
+            return DummyResponse(payload)
+
+    monkeypatch.setattr(triage, "get_combined_model", lambda: DummyModel())
+
+    email_text = (
+        "From: Erin <erin@example.com>\n"
+        "Subject: Signed contract\n\n"
+        "Can you send the signed contract today? Happy to call if easier."
+    )
+
+    result = triage.classify_and_draft(email_text)
+
+    assert result["actionable"] is True
+    assert result["importance"] is True
+    assert result["reply_needed"] is True
+    assert result["notification"] == "Erin needs the signed contract today."
+    assert len(result["summary"]) == 3
+    assert result["reply_draft"].startswith("Hi Erin,")
+
+
+def test_classify_and_draft_skips_model_and_guidance_for_marketing(monkeypatch):
+    class ExplodingModel:
+        def generate_content(self, *args, **kwargs):  # pragma: no cover - guard
+            raise AssertionError("model should not be called for plain marketing")
+
+    monkeypatch.setattr(triage, "get_combined_model", lambda: ExplodingModel())
+
+    email_text = (
+        "From: Promotions <promo@example.com>\n"
+        "Subject: Weekly Deals\n\n"
+        "Don't miss our sale. Unsubscribe here."
+    )
+
+    result = triage.classify_and_draft(email_text)
+
+    assert result["actionable"] is False
+    assert result["importance"] is False
+    assert result["reply_needed"] is False
+    assert result["rationale"] == "Rule-based marketing classification; LLM skipped."
+    assert result["notification"] == ""
+    assert result["summary"] == []
+    assert result["reply_draft"] == ""
+
+
 def test_mentions_user_name_detects_alias(monkeypatch):
     monkeypatch.setenv("INBOX_OWNER_NAME", "Alex Johnson")
     monkeypatch.setenv("INBOX_OWNER_ALIASES", "AJ,Alex J.")
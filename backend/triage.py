@@ -1,13 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
 import json
-import ast
 import logging
 import os
 import re
-from functools import lru_cache
-from typing import Any, Iterable
+import threading
+import time
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+from typing import Any, AsyncIterator, Iterable, Optional
+
+try:
+    # The SDK validates response schemas through pydantic, which rejects
+    # typing.TypedDict on Python < 3.12.
+    from typing_extensions import TypedDict
+except ImportError:  # pragma: no cover - stdlib TypedDict works on 3.12+
+    from typing import TypedDict
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# The SDK drags in grpc/protobuf and dominates import time; it is loaded
+# lazily by _ensure_sdk() so heuristic-only paths never pay for it.
+genai: Any = None
+types: Any = None
+
+
+def _ensure_sdk() -> None:
+    global genai, types
+    if genai is None:
+        import google.generativeai as _genai
+        from google.generativeai import types as _types
+
+        genai = _genai
+        types = _types
 
-import google.generativeai as genai
-from google.generativeai import types
 
 logger = logging.getLogger(__name__)
 MODEL_NAME = os.getenv("GOOGLE_GENAI_MODEL", "gemini-2.5-flash")
@@ -61,6 +93,292 @@ DOCUMENT_REQUEST_NOUNS = (
     "agreement",
 )
 
+MARKETING_CUES = (
+    "unsubscribe",
+    "view this email in your browser",
+    "view in browser",
+    "special offer",
+    "limited time",
+    "sale",
+    "deal",
+    "% off",
+    "discount",
+    "coupon",
+    "promo code",
+    "advertisement",
+    "this advertisement",
+    "sponsored",
+    "sponsor",
+    "partner offer",
+    "paid partnership",
+    "paid promotion",
+    "promotional email",
+    "book now",
+    "rent a car",
+    "loyalty",
+    "rewards",
+    "exclusive offer",
+    "upgrade now",
+    "act now",
+    "shop now",
+    "learn more",
+    "manage your preferences",
+    "update your preferences",
+    "manage preferences",
+    "manage subscription",
+    "view this message online",
+    "view online",
+    "privacy policy",
+    "no longer wish to receive",
+    "why am i receiving",
+    "you received this email because",
+    "you are receiving this email because",
+    "you received this because",
+    "newsletter",
+    "digest",
+    "webinar",
+    "flash sale",
+)
+
+REPLY_EXPLICIT_PHRASES = (
+    "please respond",
+    "please reply",
+    "please confirm",
+    "please let me know",
+    "let me know",
+    "do let me know",
+    "kindly let me know",
+    "need your response",
+    "awaiting your response",
+    "awaiting your reply",
+    "awaiting your confirmation",
+    "pls advise",
+    "please advise",
+    "rsvp",
+    "let us know",
+    "looking forward to your response",
+    "looking forward to hearing from you",
+    "appreciate your quick response",
+    "appreciate your response",
+    "any update",
+    "any updates",
+    "status update",
+    "status on",
+    "follow up on",
+    "following up on",
+    "follow up with",
+    "follow-up on",
+)
+
+MARKETING_RHETORICAL_PHRASES = (
+    "can you believe",
+    "would you like",
+    "would you love",
+    "can you handle",
+    "are you ready",
+    "ready for",
+    "will you join us",
+    "would you join us",
+    "can we tempt you",
+    "can we interest you",
+    "could we interest you",
+    "are you excited",
+)
+
+QUESTION_MARKETING_KEYWORDS = (
+    "deal",
+    "deals",
+    "sale",
+    "discount",
+    "offer",
+    "offers",
+    "promo",
+    "promotion",
+    "upgrade",
+    "flash sale",
+)
+
+FOLLOWUP_KEYWORDS = (
+    "available",
+    "availability",
+    "able",
+    "schedule",
+    "calendar",
+    "time",
+    "date",
+    "deadline",
+    "status",
+    "update",
+    "updates",
+    "follow up",
+    "follow-up",
+    "next step",
+    "next steps",
+    "confirm",
+    "confirmation",
+    "details",
+    "question for",
+    "feedback",
+    "thoughts",
+    "join",
+    "joining",
+    "attend",
+    "attendance",
+    "free",
+    "coming",
+    "call",
+    "call me",
+    "chat",
+    "discuss",
+    "discussion",
+    "meet",
+    "meeting",
+    "sync",
+    "touch base",
+    "connect",
+    "share",
+    "send",
+    "send me",
+    "provide",
+    "deliver",
+    "deliverable",
+    "document",
+    "documents",
+    "doc",
+    "deck",
+    "slide",
+    "slides",
+    "report",
+    "notes",
+    "plan",
+    "proposal",
+    "quote",
+    "invoice",
+    "contract",
+    "signature",
+    "sign",
+    "approve",
+    "approval",
+    "review",
+    "take a look",
+    "look over",
+    "input",
+    "decision",
+    "answer",
+    "help",
+    "support",
+    "issue",
+    "problem",
+    "reschedule",
+    "make it",
+)
+
+SCHEDULING_PHRASES = (
+    "can we meet",
+    "could we meet",
+    "shall we meet",
+    "should we meet",
+    "can we talk",
+    "could we talk",
+    "should we talk",
+    "can we discuss",
+    "could we discuss",
+    "should we discuss",
+    "can we connect",
+    "could we connect",
+    "should we connect",
+)
+
+ROUNDUP_SUBJECT_CUES = (
+    "newsletter",
+    "digest",
+    "roundup",
+    "summary",
+    "highlights",
+    "top stories",
+    "top picks",
+    "in case you missed",
+)
+
+SENDER_CUES = (
+    "newsletter",
+    "no-reply",
+    "noreply",
+    "updates",
+    "offers",
+    "promotions",
+    "marketing",
+    "sales",
+    "mailer",
+    "notification",
+    "@info",
+    "@news",
+    "@email.",
+    "@mail.",
+    "@mailer",
+    "@campaign",
+    "@notify",
+    "@marketing",
+    "@promo",
+    "@deals",
+    "@updates.",
+    "@messaging",
+    "@communication",
+)
+
+
+_NOREPLY_TAGS = ("no-reply", "noreply", "do-not-reply", "donotreply")
+
+_TRUE_STRINGS = frozenset({"true", "1", "yes"})
+
+
+def _cue_pattern(cues: tuple[str, ...]) -> re.Pattern[str]:
+    """Compile a cue tuple into one alternation so a single C-level scan
+    replaces a Python loop of substring searches."""
+    return re.compile("|".join(re.escape(cue) for cue in cues))
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9%]+")
+
+# Single-word cues become an O(1) set-membership check against the
+# email's token set; only multi-word phrases still need a substring scan.
+_MARKETING_SINGLE_TOKENS = frozenset(
+    cue for cue in MARKETING_CUES if _TOKEN_RE.fullmatch(cue)
+)
+
+# Compiled once at import; these run against every polled email, and re's
+# string-keyed cache is too small to rely on under load.
+_MARKETING_PHRASE_RE = _cue_pattern(
+    tuple(cue for cue in MARKETING_CUES if not _TOKEN_RE.fullmatch(cue))
+)
+_SENDER_CUE_RE = _cue_pattern(SENDER_CUES)
+_REPLY_PHRASE_RE = _cue_pattern(REPLY_EXPLICIT_PHRASES)
+_MARKETING_RHETORICAL_RE = _cue_pattern(MARKETING_RHETORICAL_PHRASES)
+_QUESTION_MARKETING_RE = _cue_pattern(QUESTION_MARKETING_KEYWORDS)
+_QUESTION_BUSINESS_RE = _cue_pattern(("schedule", "meeting", "contract", "invoice", "quote"))
+_FOLLOWUP_CUE_RE = _cue_pattern(FOLLOWUP_KEYWORDS)
+_SCHEDULING_PHRASE_RE = _cue_pattern(SCHEDULING_PHRASES)
+_ROUNDUP_CUE_RE = _cue_pattern(ROUNDUP_SUBJECT_CUES)
+_MARKETING_RES = (
+    re.compile(r"\bthis (?:email|message) (?:is|was) (?:an )?advertisement\b"),
+    re.compile(r"\bpaid (?:partner|partnership|promotion)\b"),
+    re.compile(r"\bpartner(?:ship)? (?:offer|message)\b"),
+    re.compile(r"\bbrand partner\b"),
+    re.compile(r"\bmember exclusive offer\b"),
+)
+_ISSUE_NUMBER_RE = re.compile(r"\bissue\s*(?:no\.?|number|#)?\s*(\d{1,4}|[ivxlcdm]{1,4})\b")
+_ROUNDUP_PERIODIC_RE = re.compile(
+    r"\b(daily|weekly|monthly|weekend)\s+(digest|newsletter|roundup|summary|update)\b"
+)
+_ROUNDUP_DISCOUNT_RE = re.compile(r"\b\d{1,3}%\s*(off|discount|savings)\b")
+_SUBJECT_PREFIX_SPLIT_RE = re.compile(r"\s*[-:]\s*")
+_SUBJECT_SEGMENT_SPLIT_RE = re.compile(r"\s*,\s*|\s+\|\s+|\s+•\s+")
+# One alternation replaces four separate pronoun searches per question line.
+_PRONOUN_RE = re.compile(r"\b(?:you|your|we|i)\b")
+_QUESTION_WH_RE = re.compile(r"\b(what|when|where|who|how|which|why)\b")
+# One translate() pass instead of three whole-string .replace() copies.
+_SMART_QUOTE_TABLE = str.maketrans({"“": '"', "”": '"', "’": "'"})
+
 DOCUMENT_REQUEST_VERBS = (
     "fill out",
     "fill in",
@@ -105,6 +423,12 @@ def _get_owner_context() -> dict[str, Any]:
 
     token_patterns = [re.compile(rf"\b{re.escape(term)}\b") for term in sorted(token_terms)]
 
+    # All phrase and token sources in one alternation; the mention check
+    # then costs one regex call instead of one per name variant. The
+    # per-pattern lists stay for callers that need to know which matched.
+    combined = [p.pattern for p in phrase_patterns] + [p.pattern for p in token_patterns]
+    owner_any_pattern = re.compile("|".join(combined)) if combined else None
+
     if display_names:
         if len(display_names) == 1:
             mention_text = display_names[0]
@@ -136,6 +460,8 @@ def _get_owner_context() -> dict[str, Any]:
         "display_names": display_names,
         "phrase_patterns": phrase_patterns,
         "token_patterns": token_patterns,
+        "token_literals": frozenset(token_terms),
+        "owner_any_pattern": owner_any_pattern,
         "instruction": instruction,
         "prompt_hint": prompt_hint,
     }
@@ -149,14 +475,34 @@ def _build_classifier_system_instruction() -> str:
         "Importance captures urgency or business impact that warrants quick attention. "
         "Reply_needed is true only when the sender clearly awaits a personal response from the user—for example direct questions, requests for confirmation, scheduling coordination, or deliverables. "
         "Treat newsletters, promotions, marketing blasts, receipts, and automated notifications as reply_needed=false unless they explicitly demand that the user reply. "
-        "Base your judgement on the sender's intent and context rather than isolated keywords, and explain any uncertainty in the rationale."
+        "Base your judgement on the sender's intent and context rather than isolated keywords, and explain any uncertainty in the rationale. "
+        "Keep the rationale to one or two short sentences."
     )
-    owner_instruction = _get_owner_context()["instruction"]
+    owner_context = _get_owner_context()
+    owner_instruction = owner_context["instruction"]
     if owner_instruction:
         base_instruction += owner_instruction
+    # The owner hint lives in the system instruction rather than the
+    # per-request prompt so every classify prompt starts with identical
+    # bytes and the provider's prefix cache can hit across requests.
+    prompt_hint = owner_context["prompt_hint"]
+    if prompt_hint:
+        base_instruction += f"\n\n{prompt_hint.strip()}"
     return base_instruction
 
 
+def _build_combined_system_instruction() -> str:
+    # The classifier rules verbatim, plus the assistant drafting duties,
+    # so one call covers what classify + craft_assistant_message did.
+    return _build_classifier_system_instruction() + (
+        " In the same JSON object also return the keys notification (string under 200 characters "
+        "addressing the user as 'you'), summary (array of up to three short bullet strings), and "
+        "reply_draft (string containing a brief email reply written in first person as the user). "
+        "Fill these three keys only when the email is important and needs a reply; otherwise return "
+        "an empty string, an empty array, and an empty string for them."
+    )
+
+
 CLASSIFIER_SYSTEM_INSTRUCTION = _build_classifier_system_instruction()
 
 QA_SYSTEM_INSTRUCTION = (
@@ -169,44 +515,133 @@ ASSISTANT_SYSTEM_INSTRUCTION = (
     "Always reply in JSON with the keys notification (string under 200 characters addressing the user as 'you'), summary (array of up to three short bullet strings), and reply_draft (string containing a brief email reply written in first person as the user)."
 )
 
-CLASSIFY_GENERATION_CONFIG = types.GenerationConfig(
-    temperature=0.1,
-    top_p=0.9,
-    top_k=32,
-    max_output_tokens=512,
-    response_mime_type="application/json",
-)
+# Schemas passed as response_schema constrain decoding server-side, so
+# the model cannot emit code fences, single quotes or smart quotes and
+# _safe_load_json resolves on its first parse attempt.
+class _ClassificationSchema(TypedDict):
+    importance: bool
+    importance_score: float
+    reply_needed: bool
+    reply_needed_score: float
+    rationale: str
+
+
+class _AssistantGuidanceSchema(TypedDict):
+    notification: str
+    summary: list[str]
+    reply_draft: str
+
+
+class _ClassifyAndDraftSchema(TypedDict):
+    importance: bool
+    importance_score: float
+    reply_needed: bool
+    reply_needed_score: float
+    rationale: str
+    notification: str
+    summary: list[str]
+    reply_draft: str
+
+
+def _config_with_schema(schema: Any, kwargs: dict) -> "types.GenerationConfig":
+    """Build a GenerationConfig carrying response_schema when the SDK can use it.
+
+    Constructing the config accepts any schema object; the SDK only
+    normalizes it inside generate_content, so force that conversion here
+    and degrade to an unconstrained JSON config instead of failing every
+    model call at request time.
+    """
+    try:
+        config = types.GenerationConfig(response_schema=schema, **kwargs)
+        types.generation_types.to_generation_config_dict(config)
+        return config
+    except Exception:
+        logger.warning(
+            "response_schema rejected by SDK; using unconstrained JSON output",
+            exc_info=True,
+        )
+        return types.GenerationConfig(**kwargs)
 
-QA_GENERATION_CONFIG = types.GenerationConfig(
-    temperature=0.3,
-    top_p=0.9,
-    top_k=32,
-    max_output_tokens=512,
-)
 
-ASSISTANT_GENERATION_CONFIG = types.GenerationConfig(
-    temperature=0.6,
-    top_p=0.9,
-    top_k=40,
-    max_output_tokens=640,
-    response_mime_type="application/json",
-)
+# Generation configs are built lazily (and once) because constructing a
+# GenerationConfig requires the SDK import deferred above.
+@lru_cache(maxsize=1)
+def _classify_config():
+    _ensure_sdk()
+    # Greedy decoding keeps the JSON deterministic, and 160 tokens is
+    # ample for the five-key schema; decode latency scales with the
+    # output budget, so this is the cheapest latency lever available.
+    kwargs = dict(
+        temperature=0.0,
+        top_p=1.0,
+        top_k=1,
+        max_output_tokens=160,
+        response_mime_type="application/json",
+    )
+    return _config_with_schema(_ClassificationSchema, kwargs)
+
+
+@lru_cache(maxsize=1)
+def _qa_config():
+    _ensure_sdk()
+    return types.GenerationConfig(
+        temperature=0.3,
+        top_p=0.9,
+        top_k=32,
+        max_output_tokens=512,
+    )
 
-try:
-    SAFETY_FINISH_REASON = types.FinishReason.SAFETY
-except AttributeError:  # pragma: no cover - fallback for SDKs without enum
-    SAFETY_FINISH_REASON = "SAFETY"
+
+@lru_cache(maxsize=1)
+def _assistant_config():
+    _ensure_sdk()
+    kwargs = dict(
+        temperature=0.6,
+        top_p=0.9,
+        top_k=40,
+        max_output_tokens=640,
+        response_mime_type="application/json",
+    )
+    return _config_with_schema(_AssistantGuidanceSchema, kwargs)
+
+
+@lru_cache(maxsize=1)
+def _combined_config():
+    _ensure_sdk()
+    # Low temperature for trustworthy flags, but enough output budget to
+    # write the notification, bullets and reply draft in the same pass.
+    kwargs = dict(
+        temperature=0.3,
+        top_p=0.9,
+        top_k=40,
+        max_output_tokens=800,
+        response_mime_type="application/json",
+    )
+    return _config_with_schema(_ClassifyAndDraftSchema, kwargs)
+
+
+@lru_cache(maxsize=1)
+def _safety_finish_reason():
+    _ensure_sdk()
+    try:
+        return types.FinishReason.SAFETY
+    except AttributeError:  # pragma: no cover - fallback for SDKs without enum
+        return "SAFETY"
 
 
 @lru_cache(maxsize=1)
 def _configure_client() -> str:
+    _ensure_sdk()
     api_key = os.getenv("GOOGLE_GENAI_API_KEY", "")
     if not api_key:
         raise RuntimeError("GOOGLE_GENAI_API_KEY is not set")
-    transport = os.getenv("GOOGLE_GENAI_TRANSPORT", "rest").strip().lower() or "rest"
+    # gRPC keeps one HTTP/2 channel and multiplexes the concurrent
+    # classify calls over it; set GOOGLE_GENAI_TRANSPORT=rest for proxy
+    # environments that cannot speak HTTP/2.
+    transport = os.getenv("GOOGLE_GENAI_TRANSPORT", "grpc").strip().lower() or "grpc"
     if transport not in {"rest", "grpc", "grpc_asyncio"}:
-        logger.warning("Unsupported transport '%s'; defaulting to REST", transport)
-        transport = "rest"
+        logger.warning("Unsupported transport '%s'; defaulting to gRPC", transport)
+        transport = "grpc"
     genai.configure(api_key=api_key, transport=transport)
     logger.info(
         "Configured Google Generative AI client (model=%s transport=%s)", MODEL_NAME, transport
@@ -234,6 +669,16 @@ def get_qa_model():
     )
 
 
+@lru_cache(maxsize=1)
+def get_combined_model():
+    _configure_client()
+    logger.info("Initialized combined triage model name=%s", MODEL_NAME)
+    return genai.GenerativeModel(
+        model_name=MODEL_NAME,
+        system_instruction=_build_combined_system_instruction(),
+    )
+
+
 @lru_cache(maxsize=1)
 def get_assistant_model():
     _configure_client()
@@ -248,9 +693,12 @@ def _refresh_owner_context():
     _get_owner_context.cache_clear()
     global CLASSIFIER_SYSTEM_INSTRUCTION
     CLASSIFIER_SYSTEM_INSTRUCTION = _build_classifier_system_instruction()
-    cache_clear = getattr(get_classifier_model, "cache_clear", None)
-    if callable(cache_clear):
-        cache_clear()
+    for model_factory in (get_classifier_model, get_combined_model):
+        cache_clear = getattr(model_factory, "cache_clear", None)
+        if callable(cache_clear):
+            cache_clear()
+    # Cached classifications baked in the old owner names; drop them.
+    _classify_cached.cache_clear()
 
 
 def _clamp_score(value: Any) -> float:
@@ -261,157 +709,174 @@ def _clamp_score(value: Any) -> float:
     return max(0.0, min(1.0, score))
 
 
+# Exact-type dispatch: one dict lookup replaces the isinstance chain,
+# and JSON never hands us subclasses of these types.
+_BOOL_COERCERS = {
+    bool: lambda value: value,
+    int: lambda value: value != 0,
+    float: lambda value: value != 0.0,
+    str: lambda value: value.strip().lower() in _TRUE_STRINGS,
+}
 def _coerce_bool(value: Any) -> bool:
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, (int, float)):
-        return value != 0
-    if isinstance(value, str):
-        return value.strip().lower() in {"true", "1", "yes"}
-    return False
+    coercer = _BOOL_COERCERS.get(type(value))
+    return coercer(value) if coercer is not None else False
+
+
+# Headers always sit at the top of the synthesized email text; bounding
+# the search keeps a "from:" deep in a quoted body from being mistaken
+# for the header and avoids scanning multi-KB bodies.
+_HEADER_SCAN_CHARS = 1024
+_FROM_HEADER_RE = re.compile(r"^from:(.*)", re.IGNORECASE | re.MULTILINE)
+_SUBJECT_HEADER_RE = re.compile(r"^subject:(.*)", re.IGNORECASE | re.MULTILINE)
+
+
+def _find_header_value(email_text: str, pattern: re.Pattern[str]) -> "tuple[int, int]":
+    """Locate a header's value span in the first _HEADER_SCAN_CHARS.
+
+    The case-insensitive pattern runs on the original text, so the
+    returned indexes are valid for slicing it — str.lower() is not
+    length-preserving (e.g. 'İ' lowers to two characters), which rules
+    out locating on a lowered copy. Returns (-1, -1) when the header is
+    absent; the value is re-bounded on the full text so a header line
+    crossing the scan limit is not truncated.
+    """
+    match = pattern.search(email_text[:_HEADER_SCAN_CHARS])
+    if match is None:
+        return (-1, -1)
+    start = match.start(1)
+    end = email_text.find("\n", start)
+    if end < 0:
+        end = len(email_text)
+    return (start, end)
 
 
 def _extract_sender_line(email_text: str) -> str:
-    for line in email_text.splitlines():
-        if line.lower().startswith("from:"):
-            return line.split(":", 1)[1].strip()
-    return ""
+    start, end = _find_header_value(email_text, _FROM_HEADER_RE)
+    return email_text[start:end].strip() if start >= 0 else ""
 
 
 def _extract_subject_line(email_text: str) -> str:
-    for line in email_text.splitlines():
-        if line.lower().startswith("subject:"):
-            return line.split(":", 1)[1].strip()
-    return ""
-
-
-def _looks_like_marketing(email_text: str) -> bool:
-    lowered = email_text.lower()
-    marketing_cues = (
-        "unsubscribe",
-        "view this email in your browser",
-        "view in browser",
-        "special offer",
-        "limited time",
-        "sale",
-        "deal",
-        "% off",
-        "discount",
-        "coupon",
-        "promo code",
-        "advertisement",
-        "this advertisement",
-        "sponsored",
-        "sponsor",
-        "partner offer",
-        "paid partnership",
-        "paid promotion",
-        "promotional email",
-        "book now",
-        "rent a car",
-        "loyalty",
-        "rewards",
-        "exclusive offer",
-        "upgrade now",
-        "act now",
-        "shop now",
-        "learn more",
-        "manage your preferences",
-        "update your preferences",
-        "manage preferences",
-        "manage subscription",
-        "view this message online",
-        "view online",
-        "privacy policy",
-        "no longer wish to receive",
-        "why am i receiving",
-        "you received this email because",
-        "you are receiving this email because",
-        "you received this because",
-        "newsletter",
-        "digest",
-        "webinar",
-        "flash sale",
-    )
-    marketing_regexes = (
-        r"\bthis (?:email|message) (?:is|was) (?:an )?advertisement\b",
-        r"\bpaid (?:partner|partnership|promotion)\b",
-        r"\bpartner(?:ship)? (?:offer|message)\b",
-        r"\bbrand partner\b",
-        r"\bmember exclusive offer\b",
-    )
-    if any(cue in lowered for cue in marketing_cues):
+    start, end = _find_header_value(email_text, _SUBJECT_HEADER_RE)
+    return email_text[start:end].strip() if start >= 0 else ""
+
+
+class _EmailView:
+    """Email text parsed once for the heuristic pre-pass.
+
+    classify() builds a single view per email so the text is lowercased
+    and split exactly once instead of per heuristic. The heuristics also
+    accept a plain string (the tests call them that way) and coerce via
+    _as_view.
+    """
+
+    def __init__(self, email_text: str) -> None:
+        self.text = email_text
+        self.lowered = email_text.lower()
+        self.lowered_lines = self.lowered.splitlines()
+        # Headers come straight from the bounded regex scan over the
+        # original text; only question lines still need the per-line
+        # sweep. Indexes from the lowered copy would be unsafe here
+        # because str.lower() can change the string length.
+        start, end = _find_header_value(email_text, _FROM_HEADER_RE)
+        self.sender = email_text[start:end].strip().lower() if start >= 0 else ""
+        start, end = _find_header_value(email_text, _SUBJECT_HEADER_RE)
+        # Original case, for _is_roundup_subject.
+        self.subject = email_text[start:end].strip() if start >= 0 else ""
+        self.question_lines = [
+            line.strip() for line in self.lowered_lines if "?" in line
+        ]  # lowercase, stripped
+
+    # classify consults several of these twice (directly and through
+    # _has_reply_cue / _default_classification); memoizing on the view
+    # keeps each sweep to one run per email.
+
+    @cached_property
+    def tokens(self) -> frozenset[str]:
+        return frozenset(_TOKEN_RE.findall(self.lowered))
+
+    @cached_property
+    def marketing(self) -> bool:
+        return _looks_like_marketing(self)
+
+    @cached_property
+    def has_list_unsubscribe(self) -> bool:
+        return _has_list_unsubscribe(self)
+
+    @cached_property
+    def reply_cue(self) -> bool:
+        return _has_reply_cue(self)
+
+    @cached_property
+    def name_mentioned(self) -> bool:
+        return _mentions_user_name(self)
+
+    @cached_property
+    def no_reply_sender(self) -> bool:
+        return _is_no_reply_sender(self)
+
+    @cached_property
+    def document_request(self) -> bool:
+        return _contains_document_request(self)
+
+    @cached_property
+    def override_marketing(self) -> bool:
+        return _should_override_marketing(self)
+
+
+def _as_view(email: "str | _EmailView") -> _EmailView:
+    return email if isinstance(email, _EmailView) else _EmailView(email)
+
+
+def _looks_like_marketing(email: "str | _EmailView") -> bool:
+    view = _as_view(email)
+    lowered = view.lowered
+    # Single-word cues resolve via one set intersection; the substring
+    # alternation only has to cover the multi-word phrases.
+    if not view.tokens.isdisjoint(_MARKETING_SINGLE_TOKENS):
+        return True
+    if _MARKETING_PHRASE_RE.search(lowered):
         return True
-    if any(re.search(pattern, lowered) for pattern in marketing_regexes):
+    if any(pattern.search(lowered) for pattern in _MARKETING_RES):
         return True
 
-    subject = _extract_subject_line(email_text)
-    if _is_roundup_subject(subject):
+    if _is_roundup_subject(view.subject):
         return True
 
-    lines = lowered.splitlines()
-    for line in lines[:5]:
+    for line in view.lowered_lines[:5]:
         if "issue" not in line:
             continue
-        if re.search(r"\bissue\s*(?:no\.?|number|#)?\s*(\d{1,4}|[ivxlcdm]{1,4})\b", line):
+        if _ISSUE_NUMBER_RE.search(line):
             if any(month in line for month in MONTH_NAMES) or any(
                 keyword in line for keyword in ("news", "newsletter", "edition", "volume")
             ):
                 return True
 
-    sender = _extract_sender_line(email_text).lower()
-    sender_cues = (
-        "newsletter",
-        "no-reply",
-        "noreply",
-        "updates",
-        "offers",
-        "promotions",
-        "marketing",
-        "sales",
-        "mailer",
-        "notification",
-        "@info",
-        "@news",
-        "@email.",
-        "@mail.",
-        "@mailer",
-        "@campaign",
-        "@notify",
-        "@marketing",
-        "@promo",
-        "@deals",
-        "@updates.",
-        "@messaging",
-        "@communication",
-    )
-    return any(cue in sender for cue in sender_cues)
+    return bool(view.sender and _SENDER_CUE_RE.search(view.sender))
 
 
-def _mentions_user_name(email_text: str) -> bool:
+def _mentions_user_name(email: "str | _EmailView") -> bool:
     context = _get_owner_context()
-    if not context["phrase_patterns"] and not context["token_patterns"]:
+    pattern = context["owner_any_pattern"]
+    if pattern is None:
         return False
 
-    lowered = email_text.lower()
-    for pattern in context["phrase_patterns"]:
-        if pattern.search(lowered):
-            return True
-    for pattern in context["token_patterns"]:
-        if pattern.search(lowered):
-            return True
-    return False
+    lowered = _as_view(email).lowered
+    # Most mail never mentions the owner at all; a plain substring sweep
+    # is far cheaper than the word-boundary alternation it gates.
+    if not any(term in lowered for term in context["token_literals"]):
+        return False
+    return bool(pattern.search(lowered))
 
 
-def _contains_priority_contact(email_text: str) -> bool:
-    lowered = email_text.lower()
+def _contains_priority_contact(email: "str | _EmailView") -> bool:
+    lowered = _as_view(email).lowered
     if "red river" in lowered and "insurance" in lowered:
         return True
     return any(keyword in lowered for keyword in PRIORITY_CONTACT_KEYWORDS)
 
 
-def _contains_document_request(email_text: str) -> bool:
-    lowered = email_text.lower()
+def _contains_document_request(email: "str | _EmailView") -> bool:
+    lowered = _as_view(email).lowered
     if any(phrase in lowered for phrase in DOCUMENT_REQUEST_PHRASES):
         return True
 
@@ -428,42 +893,33 @@ def _contains_document_request(email_text: str) -> bool:
     return False
 
 
-def _should_override_marketing(email_text: str) -> bool:
-    if not _contains_priority_contact(email_text):
+def _should_override_marketing(email: "str | _EmailView") -> bool:
+    view = _as_view(email)
+    if not _contains_priority_contact(view):
         return False
-    return _contains_document_request(email_text)
+    return view.document_request
 
 
 def _is_roundup_subject(subject: str) -> bool:
     if not subject:
         return False
     subject_lower = subject.lower()
-    if re.search(r"\b(daily|weekly|monthly|weekend)\s+(digest|newsletter|roundup|summary|update)\b", subject_lower):
+    if _ROUNDUP_PERIODIC_RE.search(subject_lower):
         return True
-    roundup_cues = (
-        "newsletter",
-        "digest",
-        "roundup",
-        "summary",
-        "highlights",
-        "top stories",
-        "top picks",
-        "in case you missed",
-    )
-    if any(cue in subject_lower for cue in roundup_cues):
+    if _ROUNDUP_CUE_RE.search(subject_lower):
         return True
-    if re.search(r"\b\d{1,3}%\s*(off|discount|savings)\b", subject_lower):
+    if _ROUNDUP_DISCOUNT_RE.search(subject_lower):
         return True
     if "flash sale" in subject_lower:
         return True
 
-    parts = re.split(r"\s*[-:]\s*", subject, maxsplit=1)
+    parts = _SUBJECT_PREFIX_SPLIT_RE.split(subject, maxsplit=1)
     if len(parts) == 2:
         prefix_lower = parts[0].strip().lower()
         suffix = parts[1]
         segments = [
             segment.strip()
-            for segment in re.split(r"\s*,\s*|\s+\|\s+|\s+•\s+", suffix)
+            for segment in _SUBJECT_SEGMENT_SPLIT_RE.split(suffix)
             if segment.strip()
         ]
         if len(segments) >= 3 and any(
@@ -474,202 +930,45 @@ def _is_roundup_subject(subject: str) -> bool:
     return False
 
 
-def _is_no_reply_sender(email_text: str) -> bool:
-    lowered = email_text.lower()
-    return any(tag in lowered for tag in ("no-reply", "noreply", "do-not-reply", "donotreply"))
+def _is_no_reply_sender(email: "str | _EmailView") -> bool:
+    lowered = _as_view(email).lowered
+    return any(tag in lowered for tag in _NOREPLY_TAGS)
 
 
-def _has_list_unsubscribe(email_text: str) -> bool:
-    return "list-unsubscribe" in email_text.lower()
+def _has_list_unsubscribe(email: "str | _EmailView") -> bool:
+    return "list-unsubscribe" in _as_view(email).lowered
 
 
-def _has_reply_cue(email_text: str) -> bool:
-    document_request = _contains_document_request(email_text)
-    marketing = _looks_like_marketing(email_text)
-    override_marketing = _should_override_marketing(email_text)
+def _has_reply_cue(email: "str | _EmailView") -> bool:
+    view = _as_view(email)
 
-    if marketing and not override_marketing:
+    if view.marketing and not view.override_marketing:
         return False
 
-    lowered = email_text.lower()
-    if document_request:
+    if view.document_request:
         return True
 
-    explicit_phrases = (
-        "please respond",
-        "please reply",
-        "please confirm",
-        "please let me know",
-        "let me know",
-        "do let me know",
-        "kindly let me know",
-        "need your response",
-        "awaiting your response",
-        "awaiting your reply",
-        "awaiting your confirmation",
-        "pls advise",
-        "please advise",
-        "rsvp",
-        "let us know",
-        "looking forward to your response",
-        "looking forward to hearing from you",
-        "appreciate your quick response",
-        "appreciate your response",
-        "any update",
-        "any updates",
-        "status update",
-        "status on",
-        "follow up on",
-        "following up on",
-        "follow up with",
-        "follow-up on",
-    )
-    if any(phrase in lowered for phrase in explicit_phrases):
+    if _REPLY_PHRASE_RE.search(view.lowered):
         return True
 
-    question_lines = [line for line in email_text.splitlines() if "?" in line]
-    if not question_lines:
+    if not view.question_lines:
         return False
 
-    marketing_rhetorical = (
-        "can you believe",
-        "would you like",
-        "would you love",
-        "can you handle",
-        "are you ready",
-        "ready for",
-        "will you join us",
-        "would you join us",
-        "can we tempt you",
-        "can we interest you",
-        "could we interest you",
-        "are you excited",
-    )
-    marketing_keywords = (
-        "deal",
-        "deals",
-        "sale",
-        "discount",
-        "offer",
-        "offers",
-        "promo",
-        "promotion",
-        "upgrade",
-        "flash sale",
-    )
-
-    pronoun_patterns = (
-        r"\byou\b",
-        r"\byour\b",
-        r"\bwe\b",
-        r"\bi\b",
-    )
-    followup_keywords = (
-        "available",
-        "availability",
-        "able",
-        "schedule",
-        "calendar",
-        "time",
-        "date",
-        "deadline",
-        "status",
-        "update",
-        "updates",
-        "follow up",
-        "follow-up",
-        "next step",
-        "next steps",
-        "confirm",
-        "confirmation",
-        "details",
-        "question for",
-        "feedback",
-        "thoughts",
-        "join",
-        "joining",
-        "attend",
-        "attendance",
-        "free",
-        "coming",
-        "call",
-        "call me",
-        "chat",
-        "discuss",
-        "discussion",
-        "meet",
-        "meeting",
-        "sync",
-        "touch base",
-        "connect",
-        "share",
-        "send",
-        "send me",
-        "provide",
-        "deliver",
-        "deliverable",
-        "document",
-        "documents",
-        "doc",
-        "deck",
-        "slide",
-        "slides",
-        "report",
-        "notes",
-        "plan",
-        "proposal",
-        "quote",
-        "invoice",
-        "contract",
-        "signature",
-        "sign",
-        "approve",
-        "approval",
-        "review",
-        "take a look",
-        "look over",
-        "input",
-        "decision",
-        "answer",
-        "help",
-        "support",
-        "issue",
-        "problem",
-        "reschedule",
-        "make it",
-    )
-    scheduling_phrases = (
-        "can we meet",
-        "could we meet",
-        "shall we meet",
-        "should we meet",
-        "can we talk",
-        "could we talk",
-        "should we talk",
-        "can we discuss",
-        "could we discuss",
-        "should we discuss",
-        "can we connect",
-        "could we connect",
-        "should we connect",
-    )
-
-    for line in question_lines:
-        lowered_line = line.lower().strip()
-        if any(phrase in lowered_line for phrase in marketing_rhetorical):
+    for lowered_line in view.question_lines:
+        if _MARKETING_RHETORICAL_RE.search(lowered_line):
             continue
-        if any(phrase in lowered_line for phrase in explicit_phrases):
+        if _REPLY_PHRASE_RE.search(lowered_line):
             return True
-        if any(phrase in lowered_line for phrase in scheduling_phrases):
+        if _SCHEDULING_PHRASE_RE.search(lowered_line):
             return True
-        if any(keyword in lowered_line for keyword in marketing_keywords) and not any(
-            keyword in lowered_line for keyword in ("schedule", "meeting", "contract", "invoice", "quote")
+        if _QUESTION_MARKETING_RE.search(lowered_line) and not _QUESTION_BUSINESS_RE.search(
+            lowered_line
         ):
             continue
-        if any(re.search(pattern, lowered_line) for pattern in pronoun_patterns):
-            if any(keyword in lowered_line for keyword in followup_keywords):
+        if _PRONOUN_RE.search(lowered_line):
+            if _FOLLOWUP_CUE_RE.search(lowered_line):
                 return True
-            if re.search(r"\b(what|when|where|who|how|which|why)\b", lowered_line):
+            if _QUESTION_WH_RE.search(lowered_line):
                 return True
 
     return False
@@ -695,7 +994,7 @@ def _iter_candidate_text(candidate: Any) -> Iterable[str]:
 def _response_to_text(response: Any) -> str:
     pieces: list[str] = []
     for candidate in getattr(response, "candidates", []) or []:
-        if getattr(candidate, "finish_reason", None) == SAFETY_FINISH_REASON:
+        if getattr(candidate, "finish_reason", None) == _safety_finish_reason():
             continue
         texts = list(_iter_candidate_text(candidate))
         if texts:
@@ -709,96 +1008,308 @@ def _response_to_text(response: Any) -> str:
     return "\n".join(pieces).strip()
 
 
-def _strip_code_fence(text: str) -> str:
-    if not text:
-        return ""
-    match = re.match(r"^\s*```(?:json)?\s*([\s\S]*?)\s*```\s*$", text, re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    return text.strip()
+_GENAI_CACHE_MODES = frozenset({"enabled", "read-only", "write-only", "replay", "disabled"})
 
 
-def _escape_unescaped_newlines(snippet: str) -> str:
-    """Replace bare newlines inside quoted strings with escaped newlines."""
+def _genai_cache_mode() -> str:
+    mode = os.getenv("INBOX_GENAI_CACHE_MODE", "disabled").strip().lower()
+    if mode not in _GENAI_CACHE_MODES:
+        logger.warning("Unknown INBOX_GENAI_CACHE_MODE '%s'; caching disabled", mode)
+        return "disabled"
+    return mode
 
-    if not snippet:
-        return ""
 
-    result: list[str] = []
-    in_string = False
-    quote_char = ""
-    escape = False
-    pending_cr_in_string = False
+def _genai_cache_path(prompt: str, config: types.GenerationConfig) -> str:
+    key = hashlib.sha256(f"{MODEL_NAME}|{config!r}|{prompt}".encode("utf-8")).hexdigest()
+    cache_dir = os.path.expanduser(
+        os.getenv("INBOX_GENAI_CACHE_DIR", "~/.cache/inbox-buddy/genai")
+    )
+    return os.path.join(cache_dir, f"{key}.txt")
 
-    for ch in snippet:
-        if pending_cr_in_string:
-            if ch == "\n" and in_string:
-                pending_cr_in_string = False
-                continue
-            pending_cr_in_string = False
 
-        if escape:
-            result.append(ch)
-            escape = False
-            continue
+def _cache_read(path: Optional[str], mode: str) -> Optional[str]:
+    if not path or mode not in ("enabled", "read-only", "replay"):
+        return None
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return fh.read()
+    except OSError:
+        if mode == "replay":
+            raise RuntimeError(f"GenAI cache miss in replay mode: {path}")
+        return None
+
+
+def _cache_write(path: Optional[str], mode: str, text: str) -> None:
+    # Empty responses are never cached.
+    if not text or not path or mode not in ("enabled", "write-only"):
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(tmp_path, path)
+    except OSError:  # pragma: no cover - cache writes are best-effort
+        logger.debug("Failed to write GenAI cache entry %s", path, exc_info=True)
+
+
+class _TokenBucket:
+    """Client-side pacing against the Gemini RPM/TPM quota.
+
+    Sleeping briefly before a call is cheaper than burning a request on a
+    429 and sitting out the server's backoff. Tokens and requests refill
+    continuously; either limit may be zero, meaning unlimited.
+    """
+
+    def __init__(self, rpm: float, tpm: float) -> None:
+        self._rpm = rpm
+        self._tpm = tpm
+        self._requests = rpm
+        self._tokens = tpm
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._last
+                self._last = now
+                if self._rpm:
+                    self._requests = min(
+                        self._rpm, self._requests + elapsed * self._rpm / 60.0
+                    )
+                if self._tpm:
+                    self._tokens = min(
+                        self._tpm, self._tokens + elapsed * self._tpm / 60.0
+                    )
+                wait = 0.0
+                if self._rpm and self._requests < 1.0:
+                    wait = (1.0 - self._requests) * 60.0 / self._rpm
+                if self._tpm and self._tokens < estimated_tokens:
+                    wait = max(
+                        wait, (estimated_tokens - self._tokens) * 60.0 / self._tpm
+                    )
+                if wait <= 0.0:
+                    if self._rpm:
+                        self._requests -= 1.0
+                    if self._tpm:
+                        self._tokens -= estimated_tokens
+                    return
+            logger.debug("Rate limiter sleeping %.2fs before model call", wait)
+            time.sleep(wait)
+
+
+def _estimate_tokens(prompt: str) -> int:
+    # Rough chars/4 heuristic; only used for pacing, not billing.
+    return len(prompt) // 4 + 1
 
-        if ch == "\\":
-            result.append(ch)
-            escape = True
-            continue
 
-        if in_string:
-            if ch == quote_char:
-                in_string = False
-                quote_char = ""
-                result.append(ch)
-            elif ch == "\r":
-                result.append("\\n")
-                pending_cr_in_string = True
-            elif ch == "\n":
-                result.append("\\n")
-            else:
-                result.append(ch)
-            continue
+@lru_cache(maxsize=1)
+def _get_rate_limiter() -> Optional[_TokenBucket]:
+    rpm = float(os.getenv("INBOX_GENAI_RPM", "0") or 0)
+    tpm = float(os.getenv("INBOX_GENAI_TPM", "0") or 0)
+    if rpm <= 0 and tpm <= 0:
+        return None
+    return _TokenBucket(max(rpm, 0.0), max(tpm, 0.0))
 
-        if ch in ('"', "'"):
-            in_string = True
-            quote_char = ch
 
-        if ch == "\r":
-            # Allow CRLF line endings without duplicating carriage returns.
-            pending_cr_in_string = False
-            continue
+def _extract_response_text(response: Any) -> str:
+    try:
+        text = (response.text or "").strip()
+    except ValueError:
+        logger.debug("response.text accessor unavailable; attempting manual extraction")
+        text = ""
+    if not text:
+        text = _response_to_text(response)
+    return text
+
+
+def _generate_text(
+    model: Any,
+    prompt: str,
+    config: types.GenerationConfig,
+    stream: bool = False,
+) -> str:
+    """Run generate_content and return the extracted response text.
+
+    When INBOX_GENAI_CACHE_MODE is enabled, byte-identical prompts are
+    served from an on-disk cache keyed by SHA-256 of model|config|prompt,
+    so re-processing the same inbox across restarts skips the network.
+    Modes: enabled, read-only, write-only, replay (raises on a miss, for
+    offline metric iteration), disabled (default).
+
+    With stream=True chunks are accumulated as they arrive, so text
+    transfer overlaps generation instead of waiting for the full
+    response; useful for the longer assistant/QA outputs.
+    """
+    mode = _genai_cache_mode()
+    path = _genai_cache_path(prompt, config) if mode != "disabled" else None
+    cached = _cache_read(path, mode)
+    if cached is not None:
+        return cached
+
+    limiter = _get_rate_limiter()
+    if limiter is not None:
+        limiter.acquire(_estimate_tokens(prompt))
+
+    if stream:
+        response = model.generate_content(
+            [{"role": "user", "parts": [prompt]}],
+            generation_config=config,
+            stream=True,
+        )
+        pieces: list[str] = []
+        for chunk in response:
+            try:
+                piece = chunk.text or ""
+            except ValueError:  # pragma: no cover - safety-blocked chunk
+                piece = ""
+            if piece:
+                pieces.append(piece)
+        text = "".join(pieces).strip()
+        if not text:
+            text = _response_to_text(response)
+    else:
+        response = model.generate_content(
+            [{"role": "user", "parts": [prompt]}],
+            generation_config=config,
+        )
+        text = _extract_response_text(response)
+    _cache_write(path, mode, text)
+    return text
+
+
+async def _generate_text_async(
+    model: Any, prompt: str, config: types.GenerationConfig
+) -> str:
+    """Async twin of _generate_text built on generate_content_async."""
+    mode = _genai_cache_mode()
+    path = _genai_cache_path(prompt, config) if mode != "disabled" else None
+    cached = _cache_read(path, mode)
+    if cached is not None:
+        return cached
+
+    limiter = _get_rate_limiter()
+    if limiter is not None:
+        # acquire may sleep; keep that off the event loop.
+        await asyncio.to_thread(limiter.acquire, _estimate_tokens(prompt))
+
+    response = await model.generate_content_async(
+        [{"role": "user", "parts": [prompt]}],
+        generation_config=config,
+    )
+    text = _extract_response_text(response)
+    _cache_write(path, mode, text)
+    return text
 
-        result.append(ch)
 
-    return "".join(result)
+def _strip_code_fence(text: str) -> str:
+    # Plain startswith/find beats the old anchored regex with its lazy
+    # [\s\S]*? group on long model outputs; this runs on every response.
+    stripped = text.strip()
+    if not stripped.startswith("```"):
+        return stripped
+    body_start = 3
+    if stripped[3:7].lower() == "json":
+        body_start = 7
+    end = stripped.rfind("```")
+    if end <= body_start:
+        return stripped
+    return stripped[body_start:end].strip()
+
+
+if orjson is not None:
+    # orjson's JSONDecodeError subclasses json.JSONDecodeError, so the
+    # except clauses below cover both parsers; bytes input skips a copy.
+    def _json_loads(snippet: str) -> Any:
+        return orjson.loads(snippet.encode("utf-8"))
+else:
+    _json_loads = json.loads
+
+
+_JSON_STRING_RE = re.compile(r'"(?:\\.|[^"\\])*"', re.DOTALL)
+
+
+def _escape_unescaped_newlines(snippet: str) -> str:
+    """Replace bare newlines inside quoted strings with escaped newlines.
+
+    One C-level regex sweep over the double-quoted string literals rather
+    than the old per-character Python state machine; DOTALL lets a literal
+    span the bare newline it contains.
+    """
+    if not snippet:
+        return ""
+    return _JSON_STRING_RE.sub(
+        lambda m: m.group(0)
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+        .replace("\r", "\\n"),
+        snippet,
+    )
+
+
+_JSON_OPENER_RE = re.compile(r"[{\[]")
+_JSON_DECODER = json.JSONDecoder()
 
 
 def _find_json_block(text: str) -> str | None:
+    # Returns the first balanced object or array; batch responses are
+    # top-level arrays, single classifications are objects. Brackets
+    # inside string literals are skipped so values like "}" cannot
+    # truncate the block, and the opener search skips any leading prose
+    # at C speed.
+    match = _JSON_OPENER_RE.search(text)
+    if match is None:
+        return None
+    start = match.start()
+    open_char = text[start]
+    close_char = "}" if open_char == "{" else "]"
     depth = 0
-    start = None
-    for idx, char in enumerate(text):
-        if char == "{":
-            if depth == 0:
-                start = idx
+    in_string = False
+    escape = False
+    for idx in range(start, len(text)):
+        char = text[idx]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char == open_char:
             depth += 1
-        elif char == "}":
-            if depth:
-                depth -= 1
-                if depth == 0 and start is not None:
-                    return text[start : idx + 1]
+        elif char == close_char:
+            depth -= 1
+            if depth == 0:
+                return text[start : idx + 1]
     return None
 
 
-def _safe_load_json(text: str) -> dict:
+def _safe_load_json(text: str) -> "dict | list":
     if not text:
         raise ValueError("Empty response from model")
 
     cleaned = _strip_code_fence(text)
-    cleaned = cleaned.replace("“", '"').replace("”", '"').replace("’", "'")
+    cleaned = cleaned.translate(_SMART_QUOTE_TABLE)
     cleaned = _escape_unescaped_newlines(cleaned)
 
+    # Happy path: raw_decode parses from the first opener in C and stops
+    # at the end of the value, so well-formed output (the overwhelming
+    # majority) never reaches the Python-level block scan below.
+    opener = _JSON_OPENER_RE.search(cleaned)
+    if opener is not None:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(cleaned, opener.start())
+        except json.JSONDecodeError:
+            pass
+        else:
+            if isinstance(obj, (dict, list)):
+                return obj
+
     candidates: list[str] = []
     block = _find_json_block(cleaned)
     if block:
@@ -806,37 +1317,44 @@ def _safe_load_json(text: str) -> dict:
     candidates.append(cleaned)
 
     for candidate in candidates:
-        snippet = _escape_unescaped_newlines(candidate.strip())
+        # `cleaned` was already escaped above; candidates are slices of it.
+        snippet = candidate.strip()
         if not snippet:
             continue
         try:
-            return json.loads(snippet)
+            return _json_loads(snippet)
         except json.JSONDecodeError:
             try:
                 normalized = _escape_unescaped_newlines(snippet.replace("'", '"'))
-                return json.loads(normalized)
+                return _json_loads(normalized)
             except json.JSONDecodeError:
                 continue
 
-    pythonish = _escape_unescaped_newlines(cleaned)
-    pythonish = re.sub(r"\btrue\b", "True", pythonish, flags=re.IGNORECASE)
-    pythonish = re.sub(r"\bfalse\b", "False", pythonish, flags=re.IGNORECASE)
-    pythonish = re.sub(r"\bnull\b", "None", pythonish, flags=re.IGNORECASE)
+    # Last resort: Python-literal style output (single quotes plus
+    # True/False/None). C-level replaces and one more json.loads are far
+    # cheaper than running ast.parse over model-controlled text.
+    jsonish = _escape_unescaped_newlines(cleaned.replace("'", '"'))
+    jsonish = (
+        jsonish.replace("True", "true")
+        .replace("False", "false")
+        .replace("None", "null")
+    )
     try:
-        obj = ast.literal_eval(pythonish)
-    except (ValueError, SyntaxError) as exc:  # pragma: no cover - defensive
+        obj = _json_loads(jsonish)
+    except json.JSONDecodeError as exc:  # pragma: no cover - defensive
         raise ValueError("Unable to coerce model output to JSON") from exc
-    if isinstance(obj, dict):
+    if isinstance(obj, (dict, list)):
         return obj
-    raise ValueError("Model output was not a JSON object")
+    raise ValueError("Model output was not a JSON object or array")
 
 
-def _default_classification(email_text: str, rationale: str) -> dict:
-    marketing = _looks_like_marketing(email_text) or _has_list_unsubscribe(email_text)
-    if marketing and _should_override_marketing(email_text):
+def _default_classification(email: "str | _EmailView", rationale: str) -> dict:
+    view = _as_view(email)
+    marketing = view.marketing or view.has_list_unsubscribe
+    if marketing and view.override_marketing:
         marketing = False
-    reply_cue = _has_reply_cue(email_text)
-    name_mentioned = _mentions_user_name(email_text)
+    reply_cue = view.reply_cue
+    name_mentioned = view.name_mentioned
 
     importance = reply_cue and not marketing
     reply_needed = importance
@@ -858,55 +1376,237 @@ def _default_classification(email_text: str, rationale: str) -> dict:
     }
 
 
+# Near-duplicate classification cache: marketing blasts and templated
+# notifications differ only in timestamps, URLs, and recipient tokens, so an
+# exact-key cache never hits. Hashing a signature with those stripped catches
+# the bulk of that traffic without the embedding model + ANN index the
+# heavyweight approach would need. Opt-in via INBOX_SEMANTIC_CACHE=1.
+_SEMANTIC_CACHE_MAX = 1024
+_semantic_cache: OrderedDict[str, dict] = OrderedDict()
+_SIGNATURE_URL_RE = re.compile(r"https?://\S+")
+_SIGNATURE_NUM_RE = re.compile(r"\b\d[\d:,./-]*\b")
+_SIGNATURE_WS_RE = re.compile(r"\s+")
+_SIGNATURE_FOOTER_RE = re.compile(
+    r"(?:unsubscribe|manage (?:your )?preferences|view this email in your browser)[\s\S]*$"
+)
+
+
+def _semantic_cache_enabled() -> bool:
+    return os.getenv("INBOX_SEMANTIC_CACHE", "").strip() == "1"
+
+
+def _semantic_signature(lowered: str) -> str:
+    text = _SIGNATURE_FOOTER_RE.sub("", lowered)
+    text = _SIGNATURE_URL_RE.sub(" ", text)
+    text = _SIGNATURE_NUM_RE.sub(" ", text)
+    text = _SIGNATURE_WS_RE.sub(" ", text).strip()
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _semantic_cache_lookup(view: _EmailView) -> "tuple[Optional[str], Optional[dict]]":
+    """Return (signature, cached result); both None when caching is off."""
+    if not _semantic_cache_enabled():
+        return None, None
+    signature = _semantic_signature(view.lowered)
+    cached = _semantic_cache.get(signature)
+    if cached is not None:
+        _semantic_cache.move_to_end(signature)
+        logger.debug("Semantic cache hit for classification")
+        return signature, dict(cached)
+    return signature, None
+
+
+def _semantic_cache_store(signature: Optional[str], data: dict) -> None:
+    if signature is None:
+        return
+    _semantic_cache[signature] = dict(data)
+    _semantic_cache.move_to_end(signature)
+    while len(_semantic_cache) > _SEMANTIC_CACHE_MAX:
+        _semantic_cache.popitem(last=False)
+
+
+def _heuristic_fastpath(view: _EmailView) -> Optional[dict]:
+    """Return a finished classification when the heuristics are conclusive.
+
+    For marketing mail without a reply cue the post-processing in
+    _finalize_classification forces importance and reply_needed to False
+    no matter what the model says, so the model call is pure waste;
+    answering locally removes the API call for the newsletter bulk of a
+    typical inbox. Off via INBOX_HEURISTIC_FASTPATH=0.
+    """
+    if os.getenv("INBOX_HEURISTIC_FASTPATH", "1").strip() != "1":
+        return None
+    if not (view.marketing or view.has_list_unsubscribe):
+        return None
+    if view.override_marketing or view.reply_cue:
+        return None
+    logger.debug("Heuristic fastpath hit; skipping model call")
+    return _finalize_classification(
+        _default_classification(
+            view, "Rule-based marketing classification; LLM skipped."
+        ),
+        view,
+    )
+
+
+# Static prompt scaffolding lives at module level so each call only joins
+# the variable pieces (and identical inputs produce identical cache keys).
+_CLASSIFY_PROMPT_HEAD = (
+    "Classify the following email. Provide the JSON object requested in the system instructions.\n"
+    "Email content is enclosed between triple backticks.\n"
+    "```\n"
+)
+_CLASSIFY_PROMPT_TAIL = "\n```"
+_ASSISTANT_PROMPT_HEAD = (
+    "A new email probably needs a personal reply. "
+    "Summarize it for the user and draft a short reply they can send. "
+    "Respond with JSON matching the schema described in the system instruction.\n"
+    "Email content is between triple backticks.\n"
+    "```\n"
+)
+_ASSISTANT_PROMPT_TAIL = "\n```"
+_COMBINED_PROMPT_HEAD = (
+    "Classify the following email and, if it is important and needs a reply, "
+    "draft the assistant guidance. Provide the JSON object requested in the system instructions.\n"
+    "Email content is enclosed between triple backticks.\n"
+    "```\n"
+)
+_QA_PROMPT_HEAD = (
+    "Context between triple quotes should be used to answer the user's question. "
+    "If the answer is not present, reply that you are not sure.\n\n"
+    "Context:\n\"\"\"\n"
+)
+_QA_PROMPT_MID = "\n\"\"\"\n\nQuestion: "
+
+
+def _build_classify_prompt(email_text: str) -> str:
+    return "".join((_CLASSIFY_PROMPT_HEAD, email_text.strip(), _CLASSIFY_PROMPT_TAIL))
+
+
+@lru_cache(maxsize=4096)
+def _classify_cached(email_hash: str, email_text: str) -> dict:
+    # email_hash keeps equal-length keys cheap to compare on hits; the
+    # text itself is still needed to compute the result on a miss.
+    view = _EmailView(email_text)
+
+    fastpath = _heuristic_fastpath(view)
+    if fastpath is not None:
+        return fastpath
+
+    signature, cached = _semantic_cache_lookup(view)
+    if cached is not None:
+        return cached
+
+    model = get_classifier_model()
+    prompt = _build_classify_prompt(email_text)
+    logger.debug("Submitting classification prompt (chars=%d)", len(email_text))
+    text = _generate_text(model, prompt, _classify_config())
+
+    data, rationale = _parse_classification_text(text)
+
+    if data is None:
+        data = _default_classification(view, rationale)
+
+    data = _finalize_classification(data, view)
+    _semantic_cache_store(signature, data)
+    return data
+
+
 def classify(email_text: str) -> dict:
+    """Classify an email, memoizing repeat texts by content hash.
+
+    Re-triage of an unchanged message (poll rerun, pagination) skips the
+    model entirely. Results are deep-copied so callers mutating the dict
+    cannot poison the cache.
+    """
+    email_hash = hashlib.blake2b(
+        email_text.encode("utf-8"), digest_size=16
+    ).hexdigest()
+    return copy.deepcopy(_classify_cached(email_hash, email_text))
+
+
+async def classify_async(email_text: str) -> dict:
+    """Async counterpart of classify, for callers fanning out many emails."""
+    view = _EmailView(email_text)
+
+    fastpath = _heuristic_fastpath(view)
+    if fastpath is not None:
+        return fastpath
+
+    signature, cached = _semantic_cache_lookup(view)
+    if cached is not None:
+        return cached
+
     model = get_classifier_model()
-    owner_context = _get_owner_context()
-    prompt = (
-        "Classify the following email. Provide the JSON object requested in the system instructions.\n"
-        "Email content is enclosed between triple backticks.\n"
-        "```\n"
-        f"{email_text.strip()}\n"
-        "```"
-    )
-    prompt_hint = owner_context.get("prompt_hint", "")
-    if prompt_hint:
-        prompt = f"{prompt_hint.strip()}\n\n{prompt}"
+    prompt = _build_classify_prompt(email_text)
     logger.debug("Submitting classification prompt (chars=%d)", len(email_text))
-    response = model.generate_content(
-        [{"role": "user", "parts": [prompt]}],
-        generation_config=CLASSIFY_GENERATION_CONFIG,
-    )
+    text = await _generate_text_async(model, prompt, _classify_config())
+
+    data, rationale = _parse_classification_text(text)
+
+    if data is None:
+        data = _default_classification(view, rationale)
+
+    data = _finalize_classification(data, view)
+    _semantic_cache_store(signature, data)
+    return data
+
+
+@lru_cache(maxsize=1)
+def _default_triage_concurrency() -> int:
     try:
-        text = (response.text or "").strip()
+        value = int(os.getenv("TRIAGE_CONCURRENCY", "16"))
     except ValueError:
-        logger.debug("response.text accessor unavailable; attempting manual extraction")
-        text = ""
-    if not text:
-        text = _response_to_text(response)
+        return 16
+    return max(1, value)
+
+
+async def classify_many(
+    emails: "list[str]",
+    concurrency: "int | None" = None,
+    mode: str = "realtime",
+) -> "list[dict]":
+    """Classify emails concurrently, keeping at most `concurrency` in flight.
+
+    Defaults to TRIAGE_CONCURRENCY (16 when unset). mode="batch" routes
+    through the offline batch API instead, trading latency for cost.
+    """
+    if mode == "batch":
+        return await asyncio.to_thread(classify_batch_offline, list(emails))
+    sem = asyncio.Semaphore(concurrency or _default_triage_concurrency())
 
-    data: dict[str, Any] | None = None
-    rationale = ""
+    async def bounded(email_text: str) -> dict:
+        async with sem:
+            return await classify_async(email_text)
 
+    return list(await asyncio.gather(*(bounded(email_text) for email_text in emails)))
+
+
+def _parse_classification_text(text: str) -> "tuple[dict | None, str]":
+    """Parse model output into a classification dict, or (None, rationale)."""
     if not text:
         logger.warning(
             "Model returned no text for classification; using heuristic fallback"
         )
-        rationale = "Model response was empty."
-    else:
-        try:
-            data = _safe_load_json(text)
-        except ValueError as exc:
-            logger.warning(
-                "Model JSON parse failed (%s); using heuristic fallback", exc
-            )
-            rationale = text[:500] or str(exc)
-        except Exception:
-            logger.exception("Failed to parse model response as JSON")
-            rationale = text[:500] or "Model response was empty."
+        return None, "Model response was empty."
 
-    if data is None:
-        data = _default_classification(email_text, rationale)
+    try:
+        data = _safe_load_json(text)
+    except ValueError as exc:
+        logger.warning("Model JSON parse failed (%s); using heuristic fallback", exc)
+        return None, text[:500] or str(exc)
+    except Exception:
+        logger.exception("Failed to parse model response as JSON")
+        return None, text[:500] or "Model response was empty."
 
+    if not isinstance(data, dict):
+        logger.warning("Model returned non-object JSON; using heuristic fallback")
+        return None, text[:500]
+    return data, ""
+
+
+def _finalize_classification(data: dict, view: _EmailView) -> dict:
+    """Apply score clamping and the heuristic overrides to a parsed result."""
     importance_score = _clamp_score(data.get("importance_score"))
     reply_needed_score = _clamp_score(data.get("reply_needed_score"))
 
@@ -923,10 +1623,10 @@ def classify(email_text: str) -> dict:
     elif reply_needed_score >= 0.6:
         reply_needed = True
 
-    marketing = _looks_like_marketing(email_text) or _has_list_unsubscribe(email_text)
-    if marketing and _should_override_marketing(email_text):
+    marketing = view.marketing or view.has_list_unsubscribe
+    if marketing and view.override_marketing:
         marketing = False
-    name_mentioned = _mentions_user_name(email_text)
+    name_mentioned = view.name_mentioned
 
     if marketing:
         if reply_needed or importance:
@@ -936,7 +1636,7 @@ def classify(email_text: str) -> dict:
         importance_score = min(importance_score, 0.3)
         reply_needed_score = min(reply_needed_score, 0.3)
     else:
-        if reply_needed and _is_no_reply_sender(email_text) and reply_needed_score < 0.95:
+        if reply_needed and view.no_reply_sender and reply_needed_score < 0.95:
             logger.debug("No-reply sender detected; overriding reply_needed flag")
             reply_needed = False
             reply_needed_score = min(reply_needed_score, 0.3)
@@ -972,38 +1672,173 @@ def classify(email_text: str) -> dict:
     return data
 
 
-def answer_question(context_text: str, question: str) -> str:
-    model = get_qa_model()
+def classify_batch(emails: "list[str]") -> "list[dict]":
+    """Classify several emails with a single model call.
+
+    Packing N emails into one prompt sends the long system instruction
+    once instead of N times and lets the provider's prefix cache hit
+    across the batch. Items the model drops or mangles fall back to the
+    per-email heuristic classification.
+    """
+    if not emails:
+        return []
+    if len(emails) == 1:
+        return [classify(emails[0])]
+
+    model = get_classifier_model()
+    sections = "\n".join(
+        f"=== EMAIL {index} ===\n```\n{email_text.strip()}\n```"
+        for index, email_text in enumerate(emails)
+    )
     prompt = (
-        "Context between triple quotes should be used to answer the user's question. "
-        "If the answer is not present, reply that you are not sure.\n\n"
-        "Context:\n" "\"\"\"\n"
-        f"{context_text}\n"
-        "\"\"\"\n\n"
-        f"Question: {question}"
+        "Classify each of the following emails. Respond with a JSON array "
+        "containing one result object per email, in the same order. Each "
+        "object must match the schema from the system instructions.\n"
+        f"{sections}"
+    )
+
+    base_config = _classify_config()
+    kwargs = dict(
+        temperature=base_config.temperature,
+        top_p=base_config.top_p,
+        top_k=base_config.top_k,
+        max_output_tokens=base_config.max_output_tokens * len(emails),
+        response_mime_type="application/json",
+    )
+    config = _config_with_schema(list[_ClassificationSchema], kwargs)
+    logger.debug(
+        "Submitting batch classification prompt (emails=%d chars=%d)",
+        len(emails),
+        len(prompt),
+    )
+    text = _generate_text(model, prompt, config)
+
+    items: "list | None" = None
+    if text:
+        try:
+            parsed = _safe_load_json(text)
+        except ValueError as exc:
+            logger.warning("Batch JSON parse failed (%s); using heuristic fallback", exc)
+        else:
+            if isinstance(parsed, list):
+                items = parsed
+            else:
+                logger.warning("Batch response was not a JSON array")
+
+    results: list[dict] = []
+    for index, email_text in enumerate(emails):
+        view = _EmailView(email_text)
+        item = items[index] if items is not None and index < len(items) else None
+        if not isinstance(item, dict):
+            item = _default_classification(
+                view, "Batch response did not include this email."
+            )
+        results.append(_finalize_classification(item, view))
+    return results
+
+
+def classify_batch_offline(emails: "list[str]") -> "list[dict]":
+    """Classify emails through the Gemini batch API for offline backfill.
+
+    Batch-mode inline requests run at roughly half the real-time unit
+    cost, which suits the initial inbox scan and nightly re-triage where
+    latency does not matter. Requires an SDK with batch support; raises
+    RuntimeError otherwise so callers can fall back to classify_many.
+    """
+    if not emails:
+        return []
+    _configure_client()
+    batches = getattr(genai, "batches", None)
+    if batches is None:
+        raise RuntimeError(
+            "Installed google-generativeai SDK does not expose the batch API; "
+            "use classify_many for bulk classification instead"
+        )
+
+    config = _classify_config()
+    batch = batches.create(
+        model=MODEL_NAME,
+        requests=[
+            {
+                "contents": [
+                    {"role": "user", "parts": [_build_classify_prompt(email_text)]}
+                ],
+                "generation_config": config,
+            }
+            for email_text in emails
+        ],
     )
+    while getattr(batch, "state", "") not in ("SUCCEEDED", "FAILED", "CANCELLED"):
+        time.sleep(5.0)
+        batch = batches.get(name=batch.name)
+    if batch.state != "SUCCEEDED":
+        raise RuntimeError(f"Batch classification ended in state {batch.state}")
+
+    responses = list(getattr(batch, "responses", ()) or ())
+    results: list[dict] = []
+    for index, email_text in enumerate(emails):
+        view = _EmailView(email_text)
+        text = ""
+        if index < len(responses):
+            text = _extract_response_text(responses[index])
+        data, rationale = _parse_classification_text(text)
+        if data is None:
+            data = _default_classification(view, rationale)
+        results.append(_finalize_classification(data, view))
+    return results
+
+
+@lru_cache(maxsize=256)
+def _answer_cached(context_hash: str, context_text: str, question: str) -> str:
+    model = get_qa_model()
+    prompt = "".join((_QA_PROMPT_HEAD, context_text, _QA_PROMPT_MID, question))
     logger.debug(
         "Answering question (context_chars=%d, question='%s')",
         len(context_text),
         question,
     )
-    response = model.generate_content(
-        [{"role": "user", "parts": [prompt]}],
-        generation_config=QA_GENERATION_CONFIG,
-    )
-    try:
-        answer = (response.text or "").strip()
-    except ValueError:  # pragma: no cover - SDK defensive path
-        logger.debug("response.text accessor unavailable for QA output")
-        answer = ""
-    if not answer:
-        answer = _response_to_text(response)
+    answer = _generate_text(model, prompt, _qa_config(), stream=True)
     if not answer:
         answer = "I'm not sure."
     logger.debug("Answer produced (chars=%d)", len(answer))
     return answer
 
 
+def answer_question(context_text: str, question: str) -> str:
+    context_hash = hashlib.blake2b(
+        context_text.encode("utf-8"), digest_size=16
+    ).hexdigest()
+    return _answer_cached(context_hash, context_text, question)
+
+
+async def astream_answer_question(
+    context_text: str, question: str
+) -> "AsyncIterator[str]":
+    """Yield QA answer fragments as the model produces them.
+
+    Interactive chat perceives first-token latency, not last-token; the
+    SSE endpoint forwards these fragments so the user sees the answer
+    forming instead of waiting for the full response.
+    """
+    model = get_qa_model()
+    prompt = "".join((_QA_PROMPT_HEAD, context_text, _QA_PROMPT_MID, question))
+    limiter = _get_rate_limiter()
+    if limiter is not None:
+        await asyncio.to_thread(limiter.acquire, _estimate_tokens(prompt))
+    response = await model.generate_content_async(
+        [{"role": "user", "parts": [prompt]}],
+        generation_config=_qa_config(),
+        stream=True,
+    )
+    async for chunk in response:
+        try:
+            piece = chunk.text or ""
+        except ValueError:  # pragma: no cover - safety-blocked chunk
+            piece = ""
+        if piece:
+            yield piece
+
+
 def craft_assistant_message(payload: dict) -> dict:
     sender = payload.get("sender", "Someone")
     subject = payload.get("subject", "(no subject)")
@@ -1012,35 +1847,20 @@ def craft_assistant_message(payload: dict) -> dict:
 
     email_text = f"From: {sender}\nSubject: {subject}\n\n{body}".strip()
     model = get_assistant_model()
-    prompt = (
-        "A new email probably needs a personal reply. "
-        "Summarize it for the user and draft a short reply they can send. "
-        "Respond with JSON matching the schema described in the system instruction.\n"
-        "Email content is between triple backticks.\n"
-        "```\n"
-        f"{email_text}\n"
-        "```"
+    prompt = "".join(
+        (_ASSISTANT_PROMPT_HEAD, email_text, _ASSISTANT_PROMPT_TAIL)
     )
 
     logger.debug(
         "Generating assistant guidance for sender='%s' subject='%s'", sender, subject
     )
 
-    response = model.generate_content(
-        [{"role": "user", "parts": [prompt]}],
-        generation_config=ASSISTANT_GENERATION_CONFIG,
-    )
-
-    try:
-        text = (response.text or "").strip()
-    except ValueError:  # pragma: no cover - SDK defensive path
-        logger.debug("response.text accessor unavailable for assistant output")
-        text = ""
-    if not text:
-        text = _response_to_text(response)
+    text = _generate_text(model, prompt, _assistant_config(), stream=True)
 
     try:
         data = _safe_load_json(text)
+        if not isinstance(data, dict):
+            raise ValueError("Assistant guidance was not a JSON object")
     except Exception:
         logger.exception("Failed to parse assistant guidance JSON")
         fallback_summary = snippet or body[:180]
@@ -1074,3 +1894,70 @@ def craft_assistant_message(payload: dict) -> dict:
         "summary": summary_items,
         "reply_draft": reply_draft,
     }
+
+
+_EMPTY_GUIDANCE = {"notification": "", "summary": (), "reply_draft": ""}
+
+
+def _normalize_guidance(data: dict) -> dict:
+    """Coerce the guidance keys on a combined result to their final shape."""
+    data["notification"] = str(data.get("notification", "") or "").strip()[:280]
+    summary = data.get("summary", [])
+    if isinstance(summary, str):
+        summary_items = [
+            item.strip(" -*•\t") for item in summary.splitlines() if item.strip()
+        ]
+    else:
+        summary_items = [str(item).strip() for item in summary if str(item).strip()]
+    data["summary"] = summary_items[:3]
+    data["reply_draft"] = str(data.get("reply_draft", "") or "").strip()
+    return data
+
+
+def classify_and_draft(email_text: str) -> dict:
+    """Classify an email and draft assistant guidance in one model call.
+
+    Returns the usual classification dict extended with notification,
+    summary and reply_draft, halving the round-trips for actionable mail
+    versus calling classify followed by craft_assistant_message. The
+    guidance keys are empty when the email is not actionable.
+    """
+    view = _EmailView(email_text)
+
+    fastpath = _heuristic_fastpath(view)
+    if fastpath is not None:
+        fastpath.update(_EMPTY_GUIDANCE)
+        return _normalize_guidance(fastpath)
+
+    model = get_combined_model()
+    prompt = "".join((_COMBINED_PROMPT_HEAD, email_text.strip(), _CLASSIFY_PROMPT_TAIL))
+    logger.debug("Submitting combined triage prompt (chars=%d)", len(email_text))
+    text = _generate_text(model, prompt, _combined_config())
+
+    data, rationale = _parse_classification_text(text)
+    if data is None:
+        data = _default_classification(view, rationale)
+        data.update(_EMPTY_GUIDANCE)
+
+    return _normalize_guidance(_finalize_classification(data, view))
+
+
+def _warm_up_models() -> None:
+    """Build the model singletons so the first real request skips setup.
+
+    Runs in a daemon thread at import: _configure_client pays the SDK
+    import plus channel construction, and instantiating the models bakes
+    their system instructions, so only network time remains when the
+    first email arrives.
+    """
+    try:
+        get_classifier_model()
+        get_combined_model()
+        get_qa_model()
+        get_assistant_model()
+    except Exception:  # pragma: no cover - warmup is best-effort
+        logger.debug("Model warmup failed; first request will retry", exc_info=True)
+
+
+if os.getenv("GOOGLE_GENAI_API_KEY"):
+    threading.Thread(target=_warm_up_models, name="genai-warmup", daemon=True).start()